@@ -14,13 +14,18 @@ import logger from './logger.js';
 
 /**
  * Queue a trade event for Discord consumption.
+ * Also NOTIFYs the trade_events channel so the dashboard API can push it to
+ * stream subscribers without polling.
  * Returns the event ID.
  */
 export async function queueEvent(eventType, symbol, data) {
   const result = await query(`
-    INSERT INTO trade_events (event_type, symbol, metadata, posted_to_discord, created_at)
-    VALUES ($1, $2, $3, false, NOW())
-    RETURNING id
+    WITH ins AS (
+      INSERT INTO trade_events (event_type, symbol, metadata, posted_to_discord, created_at)
+      VALUES ($1, $2, $3, false, NOW())
+      RETURNING id
+    )
+    SELECT id, pg_notify('trade_events', id::text) FROM ins
   `, [eventType, symbol, JSON.stringify(data)]);
 
   const eventId = result.rows[0].id;
@@ -41,6 +46,28 @@ export async function getPendingEvents(limit = 50) {
   return result.rows;
 }
 
+/**
+ * Page through pending events in ID order (keyset pagination), so callers can
+ * walk the whole backlog rather than just the first page.
+ */
+export async function getPendingEventsAfter(afterId, limit = 50) {
+  const result = await query(`
+    SELECT * FROM trade_events
+    WHERE posted_to_discord = false AND id > $1
+    ORDER BY id ASC
+    LIMIT $2
+  `, [afterId, limit]);
+  return result.rows;
+}
+
+/**
+ * Get a single event by ID (used to push NOTIFY'd events to stream subscribers).
+ */
+export async function getEventById(eventId) {
+  const result = await query('SELECT * FROM trade_events WHERE id = $1', [eventId]);
+  return result.rows[0] || null;
+}
+
 /**
  * Mark events as posted after Discord bot processes them.
  */
@@ -5,69 +5,349 @@ Polls VPS API for trade events, formats with local Ollama, posts to Discord.
 
 import discord
 import asyncio
-import requests
-import json
+import aiohttp
+import diskcache
+import hashlib
 import logging
+import math
+import ollama
+import os
+import random
+import string
+import orjson
+import time
+from collections import ChainMap, OrderedDict
+from contextlib import aclosing
 from datetime import datetime
 from pathlib import Path
+from cachetools import TTLCache
 
 # ── Config ──────────────────────────────────────────────────
 
-config_path = Path(__file__).parent / "config.json"
-with open(config_path) as f:
-    CONFIG = json.load(f)
+config_path = Path(os.environ.get("OLLAMA_BOT_CONFIG") or Path(__file__).parent / "config.json")
+CONFIG = orjson.loads(config_path.read_bytes())
 
 VPS_API_URL = CONFIG["vps_api_url"]
 VPS_API_KEY = CONFIG["vps_api_key"]
 DISCORD_TOKEN = CONFIG["discord_bot_token"]
 OLLAMA_MODEL = CONFIG.get("ollama_model", "llama3.1:8b")
+OLLAMA_HOST = CONFIG.get("ollama_host")  # None → OLLAMA_HOST env / localhost
+OLLAMA_TIMEOUT = CONFIG.get("ollama_timeout_seconds", 90)
 REPORT_CHANNEL = CONFIG.get("daily_report_channel_name", "daily_report")
 DASH_CHANNEL = CONFIG.get("dashboard_channel_name", "dashboard")
+REPORT_CHANNEL_ID = int(CONFIG.get("daily_report_channel_id") or 0)
+DASH_CHANNEL_ID = int(CONFIG.get("dashboard_channel_id") or 0)
+CACHE_DIR = Path(CONFIG.get("ollama_cache_dir") or Path(__file__).parent / ".cache" / "ollama")
 POLL_INTERVAL = CONFIG.get("poll_interval_seconds", 30)
+POLL_MAX_INTERVAL = CONFIG.get("poll_max_interval_seconds", 300)
+USE_EVENT_STREAM = CONFIG.get("use_event_stream", True)
+STREAM_BATCH_MAX = 50
+# While streaming, still sweep get_events occasionally to pick up anything the
+# push missed (failed posts, dropped notifications).
+STREAM_SWEEP_INTERVAL = CONFIG.get("stream_sweep_interval_seconds", 120)
+STREAM_SWEEP_LIMIT = 200
+EMBED_BATCH_THRESHOLD = 3  # batches larger than this are sent as embeds
+EMBEDS_PER_MESSAGE = 10
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
 log = logging.getLogger("ollama-bot")
 
+
+def _dumps(obj, option=0):
+    """orjson.dumps decoded to str; unsupported types fall back to str()."""
+    return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS | option).decode()
+
+
 # ── VPS API ─────────────────────────────────────────────────
 
-def call_vps_api(action, extra_data=None):
-    """POST to VPS dashboard API. Returns parsed JSON or None on error."""
-    body = {"action": action}
-    if extra_data:
-        body.update(extra_data)
-    try:
-        resp = requests.post(
-            f"{VPS_API_URL}/api/dashboard",
+# Shared aiohttp session, created in on_ready once the event loop is running.
+# Keeps connections to the VPS alive across polls without a thread hop per call.
+http_session = None
+API_SEM = asyncio.Semaphore(10)
+
+# Retries for 429/5xx and dropped connections. Other 4xx fail immediately.
+API_MAX_RETRIES = 4
+API_BACKOFF_BASE = 0.5  # seconds, doubled per attempt
+API_RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Interactive callers (user questions) give up rather than wait longer than this
+# between attempts; the background loops pick up the backoff instead.
+API_INTERACTIVE_MAX_WAIT = 2.0
+# When the VPS keeps rate-limiting us past our retries, background loops hold
+# off until this monotonic deadline (see vps_backoff_remaining).
+_vps_backoff_until = 0.0
+
+
+async def open_http_session():
+    """Create the shared aiohttp session (idempotent across reconnects)."""
+    global http_session
+    if http_session is None or http_session.closed:
+        http_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=10, limit_per_host=10, keepalive_timeout=60),
+            timeout=aiohttp.ClientTimeout(total=15, connect=3),
             headers={"x-api-key": VPS_API_KEY, "Content-Type": "application/json"},
-            json=body,
-            timeout=15,
+            json_serialize=_dumps,
         )
-        if resp.status_code == 200:
-            return resp.json()
-        log.error(f"API {action} returned {resp.status_code}: {resp.text[:200]}")
+    return http_session
+
+
+async def close_http_session():
+    """Close the shared aiohttp session on shutdown."""
+    global http_session
+    if http_session is not None and not http_session.closed:
+        await http_session.close()
+    http_session = None
+
+
+def _parse_metadata(record):
+    """Decode a record's metadata in place if the API sent it as a JSON string."""
+    meta = record.get("metadata")
+    if isinstance(meta, str):
+        try:
+            record["metadata"] = orjson.loads(meta)
+        except orjson.JSONDecodeError:
+            record["metadata"] = {}
+    return record
+
+
+def _retry_after_seconds(resp):
+    """Retry-After header as seconds (capped at POLL_MAX_INTERVAL), or None if
+    absent, not numeric or not finite."""
+    try:
+        seconds = float(resp.headers.get("Retry-After", ""))
+    except ValueError:
         return None
-    except Exception as e:
-        log.error(f"API {action} failed: {e}")
+    if not math.isfinite(seconds):
         return None
+    return min(max(0.0, seconds), POLL_MAX_INTERVAL)
+
+
+def vps_backoff_remaining():
+    """Seconds left before the VPS asked us to resume calling it."""
+    return max(0.0, _vps_backoff_until - time.monotonic())
+
+
+async def call_vps_api(action, extra_data=None, interactive=False):
+    """POST to VPS dashboard API. Returns parsed JSON or None on error.
+
+    429/5xx responses and connection errors are retried with jittered
+    exponential backoff, honouring Retry-After when the server sends it.
+    With interactive=True, gives up instead of waiting longer than
+    API_INTERACTIVE_MAX_WAIT between attempts.
+    """
+    global _vps_backoff_until
+    body = {"action": action}
+    if extra_data:
+        body.update(extra_data)
+    for attempt in range(API_MAX_RETRIES + 1):
+        delay = API_BACKOFF_BASE * (2 ** attempt)
+        delay += random.uniform(0, delay * 0.1)
+        try:
+            session = await open_http_session()
+            async with API_SEM:
+                async with session.post(f"{VPS_API_URL}/api/dashboard", json=body) as resp:
+                    if resp.status == 200:
+                        result = orjson.loads(await resp.read())
+                        # Normalize event metadata once here so formatters only see dicts
+                        data = result.get("data") if isinstance(result, dict) else None
+                        if isinstance(data, list):
+                            for record in data:
+                                if isinstance(record, dict):
+                                    _parse_metadata(record)
+                        return result
+                    text = await resp.text()
+                    retry_after = _retry_after_seconds(resp)
+            if resp.status not in API_RETRY_STATUSES:
+                log.error(f"API {action} returned {resp.status}: {text[:200]}")
+                return None
+            if retry_after is not None:
+                delay = retry_after
+            if attempt == API_MAX_RETRIES or (interactive and delay > API_INTERACTIVE_MAX_WAIT):
+                log.error(f"API {action} returned {resp.status} after {attempt + 1} attempts: {text[:200]}")
+                if resp.status == 429:
+                    _vps_backoff_until = time.monotonic() + delay
+                return None
+            log.warning(f"API {action} returned {resp.status}, retrying in {delay:.1f}s")
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            if attempt == API_MAX_RETRIES or (interactive and delay > API_INTERACTIVE_MAX_WAIT):
+                log.error(f"API {action} failed after {attempt + 1} attempts: {e}")
+                return None
+            log.warning(f"API {action} failed ({e}), retrying in {delay:.1f}s")
+        except Exception as e:
+            log.error(f"API {action} failed: {e}")
+            return None
+        await asyncio.sleep(delay)
 
 # ── Ollama Formatting ───────────────────────────────────────
 
-def call_ollama(prompt, max_tokens=400):
+OLLAMA_CLIENT = ollama.AsyncClient(host=OLLAMA_HOST)
+STREAM_EDIT_INTERVAL = 0.8  # seconds between Discord message edits while streaming
+# Ollama runs one model on one GPU and serializes requests anyway; queue them
+# here instead of piling concurrent calls onto it. Held only around the chat
+# call itself, so cache hits and fallbacks never wait on it.
+OLLAMA_SEM = asyncio.Semaphore(CONFIG.get("ollama_concurrency", 1))
+
+# Fixed system prompts. Keeping the instructions byte-identical across calls
+# lets Ollama reuse the cached prefix; only the short user message varies.
+SYSTEM_PROMPT_EVENT = (
+    "Format trading events as short Discord messages. "
+    "Use emoji. Keep under 300 characters. Be concise. "
+    "Dollar amounts are already formatted — use them exactly as shown."
+)
+SYSTEM_PROMPT_QA = (
+    "You are a helpful trading assistant for the OpenClaw crypto trading system. "
+    "Answer the user's question in plain English sentences. Do NOT respond with JSON, code blocks, or raw data. "
+    "Use dollar signs for money and percent signs for percentages. Be concise (under 1800 chars)."
+)
+
+# Two-tier response cache: exact prompt hash, plus a per-event key that ignores
+# the timestamp so repeated events skip inference. Keys include the model name
+# so switching models never serves stale text.
+_ollama_cache = TTLCache(maxsize=1024, ttl=600)
+_event_cache = TTLCache(maxsize=512, ttl=600)
+
+# On-disk L2 behind both caches so formatted text survives bot restarts.
+# diskcache is SQLite-backed and blocking, so it is only touched from worker
+# threads; a slow disk must not stall the Discord gateway heartbeat.
+_disk_cache = diskcache.Cache(str(CACHE_DIR), size_limit=200 * 1024 * 1024)
+DISK_CACHE_TTL = 3600
+
+
+async def _cache_get(memory_cache, key):
+    """Look up key in the in-memory cache, then on disk (promoting hits)."""
+    value = memory_cache.get(key)
+    if value is None:
+        try:
+            value = await asyncio.to_thread(_disk_cache.get, key)
+        except Exception as e:
+            log.warning(f"Disk cache read failed: {e}")
+            return None
+        if value is not None:
+            memory_cache[key] = value
+    return value
+
+
+async def _cache_set(memory_cache, key, value):
+    memory_cache[key] = value
+    try:
+        await asyncio.to_thread(_disk_cache.set, key, value, expire=DISK_CACHE_TTL)
+    except Exception as e:
+        log.warning(f"Disk cache write failed: {e}")
+
+
+def _ollama_options(max_tokens, stop=None, temperature=None):
+    options = {"num_predict": max_tokens}
+    if stop:
+        options["stop"] = stop
+    if temperature is not None:
+        options["temperature"] = temperature
+    return options
+
+
+def _prompt_key(system, user, options):
+    data = f"{OLLAMA_MODEL}\0{_dumps(options, orjson.OPT_SORT_KEYS)}\0{system}\0{user}".encode()
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+def _event_key(event, meta):
+    """Canonical cache key for an event: type, symbol and exact metadata."""
+    fields = _dumps(meta, orjson.OPT_SORT_KEYS)
+    return (OLLAMA_MODEL, event.get("event_type"), event.get("symbol"), fields)
+
+
+async def call_ollama(system, user, max_tokens=400, stop=None, temperature=None):
     """Call local Ollama. Returns generated text or None."""
+    options = _ollama_options(max_tokens, stop, temperature)
+    key = _prompt_key(system, user, options)
+    cached = await _cache_get(_ollama_cache, key)
+    if cached is not None:
+        return cached
     try:
-        import ollama as ol
-        response = ol.chat(
-            model=OLLAMA_MODEL,
-            messages=[{"role": "user", "content": prompt}],
-            format="",
-            options={"num_predict": max_tokens},
-        )
-        return response["message"]["content"].strip()
+        async with OLLAMA_SEM:
+            # Bounded so a hung generation can't hold OLLAMA_SEM and stall
+            # every queued event; callers fall back to templates on None.
+            response = await asyncio.wait_for(
+                OLLAMA_CLIENT.chat(
+                    model=OLLAMA_MODEL,
+                    messages=[
+                        {"role": "system", "content": system},
+                        {"role": "user", "content": user},
+                    ],
+                    format="",
+                    options=options,
+                ),
+                OLLAMA_TIMEOUT,
+            )
+        text = response["message"]["content"].strip()
+        if text:
+            await _cache_set(_ollama_cache, key, text)
+        return text
+    except asyncio.TimeoutError:
+        log.error(f"Ollama timed out after {OLLAMA_TIMEOUT}s")
+        return None
     except Exception as e:
         log.error(f"Ollama error: {e}")
         return None
 
 
+async def stream_ollama(system, user, max_tokens=400, stop=None, temperature=None):
+    """Stream a response from local Ollama, yielding text chunks as they arrive.
+
+    Yields nothing if Ollama fails before producing output. A cache hit is
+    yielded as a single chunk.
+    """
+    options = _ollama_options(max_tokens, stop, temperature)
+    key = _prompt_key(system, user, options)
+    cached = await _cache_get(_ollama_cache, key)
+    if cached is not None:
+        yield cached
+        return
+    # Generate in a separate task so OLLAMA_SEM is held only while Ollama is
+    # producing tokens, not while the caller awaits Discord between chunks.
+    pieces = asyncio.Queue()
+    completed = False
+
+    async def generate():
+        stream = await OLLAMA_CLIENT.chat(
+            model=OLLAMA_MODEL,
+            messages=[
+                {"role": "system", "content": system},
+                {"role": "user", "content": user},
+            ],
+            format="",
+            options=options,
+            stream=True,
+        )
+        async for chunk in stream:
+            piece = chunk["message"]["content"]
+            if piece:
+                await pieces.put(piece)
+
+    async def produce():
+        nonlocal completed
+        try:
+            async with OLLAMA_SEM:
+                await asyncio.wait_for(generate(), OLLAMA_TIMEOUT)
+            completed = True
+        except asyncio.TimeoutError:
+            log.error(f"Ollama stream timed out after {OLLAMA_TIMEOUT}s")
+        except Exception as e:
+            log.error(f"Ollama stream error: {e}")
+        finally:
+            pieces.put_nowait(None)
+
+    producer = asyncio.create_task(produce())
+    parts = []
+    try:
+        while (piece := await pieces.get()) is not None:
+            parts.append(piece)
+            yield piece
+    finally:
+        producer.cancel()
+    text = "".join(parts).strip()
+    if completed and text:
+        await _cache_set(_ollama_cache, key, text)
+
+
 def _preformat_dollars(meta):
     """Pre-format dollar/percent fields so the LLM can't mangle them."""
     if not isinstance(meta, dict):
@@ -86,65 +366,92 @@ def _preformat_dollars(meta):
     return formatted
 
 
-def format_event_with_ollama(event):
+async def format_event_with_ollama(event):
     """Format a trade event into a concise Discord message using Ollama."""
     meta = event.get("metadata")
-    if isinstance(meta, str):
-        try:
-            meta = json.loads(meta)
-        except:
-            pass
+    event_key = _event_key(event, meta)
+    cached = await _cache_get(_event_cache, event_key)
+    if cached is not None:
+        return cached
     display_meta = _preformat_dollars(meta)
-    prompt = (
-        f"Format this trading event as a short Discord message. "
-        f"Use emoji. Keep under 300 characters. Be concise. "
-        f"Dollar amounts are already formatted — use them exactly as shown.\n\n"
+    user = (
         f"Type: {event.get('event_type')}\n"
         f"Symbol: {event.get('symbol', 'N/A')}\n"
-        f"Data: {json.dumps(display_meta, default=str)[:500]}\n"
-        f"Time: {event.get('created_at', '')}"
+        f"Data: {_dumps(display_meta)[:500]}"
     )
-    result = call_ollama(prompt, max_tokens=200)
+    # ~90 tokens covers the 300-char target; stop at the first blank line.
+    result = await call_ollama(SYSTEM_PROMPT_EVENT, user, max_tokens=90, stop=["\n\n"], temperature=0.2)
     if result:
-        return result[:500]
+        result = result[:500]
+        await _cache_set(_event_cache, event_key, result)
+        return result
     return format_event_fallback(event)
 
 
+# Fallback templates, built once. Fields missing from metadata fall through to
+# _TEMPLATE_DEFAULTS: "?" unless a template needs something else.
+_TEMPLATES = {
+    "BUY": "🟢 **BUY** {sym} @ ${price} | Conf: {confidence} | {reasoning_trunc}",
+    "SELL": "🔴 **SELL** {sym} @ ${price} | P&L: ${pnl} ({pnl_percent}%)",
+    "DCA": "🔵 **DCA** {sym} @ ${price} | New avg: ${new_avg_entry}",
+    "PARTIAL_EXIT": "💰 **PARTIAL EXIT** {sym} {exit_percent}% @ ${price} | P&L: ${pnl}",
+    "CIRCUIT_BREAKER": "⚠️ **CIRCUIT BREAKER** | {consecutive_losses} losses | Pausing {cooldown_hours}h",
+    "HOURLY_SUMMARY": "📊 **Hourly** | {open_positions} positions | P&L: ${unrealized_pnl:.2f} unrealized, ${realized_pnl:.2f} realized",
+    "ENGINE_START": "🚀 **Engine Started** | {symbols} symbols | ${capital} capital | Paper: {paper_trading}",
+    "ENGINE_STOP": "🛑 **Engine Stopped** | {cycle_count} cycles completed",
+}
+_DEFAULT_TEMPLATE = "📌 **{et}** {sym} | {meta_json}"
+_TEMPLATE_DEFAULTS = {
+    field: "?"
+    for template in _TEMPLATES.values()
+    for _, field, _, _ in string.Formatter().parse(template)
+    if field
+}
+_TEMPLATE_DEFAULTS.update({"exit_percent": "", "open_positions": 0, "unrealized_pnl": 0, "realized_pnl": 0})
+
+
 def format_event_fallback(event):
     """Simple fallback formatter when Ollama is unavailable."""
     et = event.get("event_type", "UNKNOWN")
     sym = event.get("symbol", "")
-    meta = event.get("metadata")
-    if isinstance(meta, str):
-        try:
-            meta = json.loads(meta)
-        except:
-            meta = {}
-    meta = meta or {}
-
-    templates = {
-        "BUY": lambda: f"🟢 **BUY** {sym} @ ${meta.get('price', '?')} | Conf: {meta.get('confidence', '?')} | {str(meta.get('reasoning', ''))[:100]}",
-        "SELL": lambda: f"🔴 **SELL** {sym} @ ${meta.get('price', '?')} | P&L: ${meta.get('pnl', '?')} ({meta.get('pnl_percent', '?')}%)",
-        "DCA": lambda: f"🔵 **DCA** {sym} @ ${meta.get('price', '?')} | New avg: ${meta.get('new_avg_entry', '?')}",
-        "PARTIAL_EXIT": lambda: f"💰 **PARTIAL EXIT** {sym} {meta.get('exit_percent', '')}% @ ${meta.get('price', '?')} | P&L: ${meta.get('pnl', '?')}",
-        "CIRCUIT_BREAKER": lambda: f"⚠️ **CIRCUIT BREAKER** | {meta.get('consecutive_losses', '?')} losses | Pausing {meta.get('cooldown_hours', '?')}h",
-        "HOURLY_SUMMARY": lambda: f"📊 **Hourly** | {meta.get('open_positions', 0)} positions | P&L: ${meta.get('unrealized_pnl', 0):.2f} unrealized, ${meta.get('realized_pnl', 0):.2f} realized",
-        "ENGINE_START": lambda: f"🚀 **Engine Started** | {meta.get('symbols', '?')} symbols | ${meta.get('capital', '?')} capital | Paper: {meta.get('paper_trading', '?')}",
-        "ENGINE_STOP": lambda: f"🛑 **Engine Stopped** | {meta.get('cycle_count', '?')} cycles completed",
-    }
-
-    formatter = templates.get(et, lambda: f"📌 **{et}** {sym} | {json.dumps(meta, default=str)[:200]}")
-    return formatter()
+    meta = event.get("metadata") or {}
+
+    template = _TEMPLATES.get(et)
+    if template is None:
+        meta_json = _dumps(meta)[:200]
+        return _DEFAULT_TEMPLATE.format(et=et, sym=sym, meta_json=meta_json)
+
+    derived = {"sym": sym, "reasoning_trunc": str(meta.get("reasoning", ""))[:100]}
+    return template.format_map(ChainMap(derived, meta, _TEMPLATE_DEFAULTS))
 
 
 # ── User Query Handler ──────────────────────────────────────
 
-def handle_user_query(question):
-    """Answer a user's question about the trading system."""
+async def fetch_query_context():
+    """Fetch portfolio, positions and decisions for a user query.
+
+    Uses the bulk get_dashboard_context action (one round trip). Falls back to
+    the individual actions, fetched concurrently, if the VPS doesn't support it yet.
+    """
+    ctx = await call_vps_api(
+        "get_dashboard_context", {"positions_limit": 10, "decisions_limit": 5}, interactive=True
+    )
+    if ctx and "data" in ctx:
+        data = ctx["data"]
+        return {"data": data["portfolio"]}, {"data": data["positions"]}, {"data": data["decisions"]}
+
+    return await asyncio.gather(
+        call_vps_api("get_portfolio_summary", interactive=True),
+        call_vps_api("get_positions", interactive=True),
+        call_vps_api("get_decisions", {"limit": 5}, interactive=True),
+    )
+
+
+async def handle_user_query(message):
+    """Answer a user's question about the trading system, streaming the reply."""
+    question = message.content
     # Fetch context from VPS
-    portfolio = call_vps_api("get_portfolio_summary")
-    positions = call_vps_api("get_positions")
-    decisions = call_vps_api("get_decisions", {"limit": 5})
+    portfolio, positions, decisions = await fetch_query_context()
 
     context = "TRADING SYSTEM DATA:\n\n"
 
@@ -179,43 +486,101 @@ def handle_user_query(question):
                 context += f"  {d.get('symbol', '?')}: {d.get('action', '?')} conf:{d.get('confidence', '?')} — {str(d.get('reasoning', ''))[:120]}\n"
             context += "\n"
 
-    prompt = (
-        f"You are a helpful trading assistant for the OpenClaw crypto trading system. "
-        f"Answer the user's question in plain English sentences. Do NOT respond with JSON, code blocks, or raw data. "
-        f"Use dollar signs for money and percent signs for percentages. Be concise (under 1800 chars).\n\n"
-        f"{context}"
-        f"User question: {question}"
-    )
+    user = f"{context}User question: {question}"
+
+    # Reply as soon as text arrives, then edit in more at most every
+    # STREAM_EDIT_INTERVAL seconds to stay clear of Discord's edit rate limit.
+    reply = None
+    sent = ""
+    answer = ""
+    last_edit = 0.0
+    # aclosing() stops generation (and frees OLLAMA_SEM) even if a Discord call raises.
+    async with aclosing(stream_ollama(SYSTEM_PROMPT_QA, user, max_tokens=350, stop=["\n\nUser"])) as stream:
+        async for piece in stream:
+            answer += piece
+            content = answer.strip()[:1900]
+            if content and content != sent and time.monotonic() - last_edit >= STREAM_EDIT_INTERVAL:
+                if reply is None:
+                    reply = await message.reply(content)
+                else:
+                    await reply.edit(content=content)
+                sent = content
+                last_edit = time.monotonic()
+
+    answer = answer.strip()
+    if not answer:
+        # Fallback: show raw data
+        answer = _raw_data_reply(portfolio)
+    content = answer[:1900]
+    if reply is None:
+        await message.reply(content)
+    elif content != sent:
+        await reply.edit(content=content)
+
+
+def _raw_data_reply(portfolio):
+    """Plain portfolio dump used when Ollama produced nothing."""
+    return f"**Portfolio:**\n```json\n{_dumps((portfolio or {}).get('data', {}), orjson.OPT_INDENT_2)[:1500]}\n```"
 
-    answer = call_ollama(prompt, max_tokens=400)
-    if answer:
-        return answer[:1900]
 
-    # Fallback: show raw data
-    return f"**Portfolio:**\n```json\n{json.dumps(portfolio.get('data', {}), indent=2, default=str)[:1500]}\n```"
+# ── Discord Bot ─────────────────────────────────────────────
 
+class OllamaBotClient(discord.Client):
+    async def close(self):
+        await super().close()
+        await close_http_session()
 
-# ── Discord Bot ─────────────────────────────────────────────
 
 intents = discord.Intents.default()
 intents.message_content = True
-client = discord.Client(intents=intents)
+client = OllamaBotClient(intents=intents)
 
 report_channel = None
 dash_channel = None
+event_task = None
+
+# IDs already sent to Discord, oldest first. Guards against re-posting (and
+# re-running Ollama) when mark_events_posted fails or the stream replays an event.
+_posted_ids = OrderedDict()
+POSTED_IDS_MAX = 10_000
+
+
+def _remember_posted(event_id):
+    _posted_ids[event_id] = None
+    _posted_ids.move_to_end(event_id)
+    if len(_posted_ids) > POSTED_IDS_MAX:
+        _posted_ids.popitem(last=False)
+
+
+async def resolve_channel(channel_id, name):
+    """Look up a channel by configured ID, or scan guilds by name if no ID is set."""
+    if channel_id:
+        channel = client.get_channel(channel_id)
+        if channel is None:
+            try:
+                channel = await client.fetch_channel(channel_id)
+            except discord.DiscordException as e:
+                log.error(f"Channel {channel_id} lookup failed: {e}")
+        return channel
+    for guild in client.guilds:
+        channel = discord.utils.get(guild.text_channels, name=name)
+        if channel:
+            return channel
+    return None
 
 
 @client.event
 async def on_ready():
-    global report_channel, dash_channel
+    global report_channel, dash_channel, event_task
     log.info(f"Bot ready as {client.user}")
+    await open_http_session()
 
-    for guild in client.guilds:
-        for ch in guild.text_channels:
-            if ch.name == REPORT_CHANNEL:
-                report_channel = ch
-            if ch.name == DASH_CHANNEL:
-                dash_channel = ch
+    # on_ready fires again on every gateway reconnect; channels and the event
+    # task only need setting up once.
+    if report_channel is None:
+        report_channel = await resolve_channel(REPORT_CHANNEL_ID, REPORT_CHANNEL)
+    if dash_channel is None:
+        dash_channel = await resolve_channel(DASH_CHANNEL_ID, DASH_CHANNEL)
 
     if report_channel:
         log.info(f"Report channel: #{report_channel.name}")
@@ -227,7 +592,8 @@ async def on_ready():
     else:
         log.warning(f"Channel #{DASH_CHANNEL} not found")
 
-    client.loop.create_task(poll_events())
+    if event_task is None or event_task.done():
+        event_task = client.loop.create_task(stream_events() if USE_EVENT_STREAM else poll_events())
 
 
 @client.event
@@ -236,43 +602,180 @@ async def on_message(message):
         return
     if dash_channel and message.channel.id == dash_channel.id:
         async with message.channel.typing():
-            answer = await asyncio.to_thread(handle_user_query, message.content)
-            await message.reply(answer)
+            await handle_user_query(message)
+
+
+async def post_events(events):
+    """Format a batch of events, post them to the report channel and mark them posted."""
+    posted_ids = []
+
+    # Already-posted events only need marking again, not another Discord post.
+    fresh = []
+    seen = set()
+    for event in events:
+        if event["id"] in _posted_ids:
+            posted_ids.append(event["id"])
+        elif event["id"] not in seen:
+            seen.add(event["id"])
+            fresh.append(event)
+    if posted_ids:
+        log.info(f"Skipping {len(posted_ids)} already-posted events")
+    events = fresh
+
+    # Format the whole batch up front; OLLAMA_SEM bounds how many hit Ollama at once.
+    formatted_all = await asyncio.gather(*(format_event_with_ollama(e) for e in events))
+
+    # Send in order so the channel reads chronologically. Bursts go out as one
+    # message of up to 10 embeds (Discord's per-message limit) instead of one
+    # send per event, to stay under the channel rate limit.
+    if report_channel and len(events) > EMBED_BATCH_THRESHOLD:
+        for i in range(0, len(events), EMBEDS_PER_MESSAGE):
+            chunk = events[i:i + EMBEDS_PER_MESSAGE]
+            texts = formatted_all[i:i + EMBEDS_PER_MESSAGE]
+            await report_channel.send(embeds=[discord.Embed(description=t) for t in texts])
+            for event in chunk:
+                _remember_posted(event["id"])
+                posted_ids.append(event["id"])
+            log.info(f"Posted {len(chunk)} events as embeds (#{chunk[0]['id']}-#{chunk[-1]['id']})")
+    elif report_channel:
+        for event, formatted in zip(events, formatted_all):
+            await report_channel.send(formatted)
+            _remember_posted(event["id"])
+            posted_ids.append(event["id"])
+            log.info(f"Posted event #{event['id']} ({event.get('event_type')})")
+
+    if posted_ids:
+        await call_vps_api("mark_events_posted", {"eventIds": posted_ids})
+        log.info(f"Marked {len(posted_ids)} events as posted")
 
 
 async def poll_events():
     """Background task: poll VPS for pending events and post to Discord."""
     await client.wait_until_ready()
-    log.info(f"Event polling started (every {POLL_INTERVAL}s)")
+    log.info(f"Event polling started (every {POLL_INTERVAL}-{POLL_MAX_INTERVAL}s)")
 
+    # Back off while the queue is empty, snap back as soon as events arrive.
+    interval = POLL_INTERVAL
     while not client.is_closed():
+        got_events = False
         try:
-            result = await asyncio.to_thread(call_vps_api, "get_events")
+            result = await call_vps_api("get_events")
             if result and "data" in result and len(result["data"]) > 0:
-                events = result["data"]
-                posted_ids = []
-
-                for event in events:
-                    formatted = format_event_fallback(event)
-                    if report_channel:
-                        await report_channel.send(formatted)
-                        posted_ids.append(event["id"])
-                        log.info(f"Posted event #{event['id']} ({event.get('event_type')})")
-
-                if posted_ids:
-                    await asyncio.to_thread(
-                        call_vps_api, "mark_events_posted", {"eventIds": posted_ids}
-                    )
-                    log.info(f"Marked {len(posted_ids)} events as posted")
+                got_events = True
+                await post_events(result["data"])
 
         except Exception as e:
             log.error(f"Poll error: {e}")
 
-        await asyncio.sleep(POLL_INTERVAL)
+        if got_events:
+            interval = POLL_INTERVAL
+        else:
+            interval = min(interval * 1.5, POLL_MAX_INTERVAL)
+        delay = max(interval + random.uniform(0, interval * 0.1), vps_backoff_remaining())
+        await asyncio.sleep(delay)
+
+
+async def event_worker(queue):
+    """Drain streamed events in batches through the same post pipeline as polling."""
+    while not client.is_closed():
+        events = [await queue.get()]
+        while not queue.empty() and len(events) < STREAM_BATCH_MAX:
+            events.append(queue.get_nowait())
+        try:
+            await post_events(events)
+        except Exception as e:
+            log.error(f"Event post error: {e}")
+
+
+async def sweep_events(queue):
+    """Periodically re-fetch pending events into the stream queue.
+
+    Covers events the push path misses: batches whose post failed, events past
+    the replay, and notifications lost while the VPS listener reconnects.
+    Overlap with streamed events is harmless; post_events skips posted IDs.
+    """
+    while not client.is_closed():
+        await asyncio.sleep(max(STREAM_SWEEP_INTERVAL, vps_backoff_remaining()))
+        try:
+            result = await call_vps_api("get_events", {"limit": STREAM_SWEEP_LIMIT})
+            if result and "data" in result:
+                for event in result["data"]:
+                    await queue.put(event)
+        except Exception as e:
+            log.error(f"Event sweep error: {e}")
+
+
+async def stream_events():
+    """Background task: receive events pushed over SSE; falls back to polling
+    if the VPS doesn't serve the stream endpoint."""
+    await client.wait_until_ready()
+    queue = asyncio.Queue()
+    helpers = [
+        asyncio.create_task(event_worker(queue)),
+        asyncio.create_task(sweep_events(queue)),
+    ]
+    try:
+        await _consume_stream(queue, helpers)
+    finally:
+        for task in helpers:
+            task.cancel()
+
+
+async def _consume_stream(queue, helpers):
+    url = f"{VPS_API_URL}/api/events/stream"
+    # Server sends a heartbeat every 25s, so a silent socket means a dead link.
+    stream_timeout = aiohttp.ClientTimeout(total=None, sock_connect=3, sock_read=90)
+    retry = POLL_INTERVAL / 10
+
+    while not client.is_closed():
+        try:
+            session = await open_http_session()
+            async with session.get(url, timeout=stream_timeout) as resp:
+                if resp.status == 404:
+                    log.warning("Event stream not available on VPS, falling back to polling")
+                    for task in helpers:
+                        task.cancel()
+                    await poll_events()
+                    return
+                if resp.status != 200:
+                    retry_after = _retry_after_seconds(resp)
+                    if retry_after is not None:
+                        retry = max(retry, retry_after)
+                    raise aiohttp.ClientResponseError(
+                        resp.request_info, resp.history, status=resp.status
+                    )
+                log.info("Event stream connected")
+                retry = POLL_INTERVAL / 10
+                async for line in resp.content:
+                    if not line.startswith(b"data:"):
+                        continue
+                    try:
+                        event = orjson.loads(line[5:])
+                    except orjson.JSONDecodeError:
+                        event = None
+                    if not isinstance(event, dict) or "id" not in event:
+                        log.warning(f"Skipping malformed stream event: {line[:200]!r}")
+                        continue
+                    await queue.put(_parse_metadata(event))
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            log.warning(f"Event stream dropped: {e}")
+        except Exception as e:
+            log.error(f"Event stream error: {e}")
+
+        await asyncio.sleep(max(retry + random.uniform(0, retry * 0.1), vps_backoff_remaining()))
+        retry = min(retry * 2, POLL_MAX_INTERVAL)
 
 
 # ── Main ────────────────────────────────────────────────────
 
 if __name__ == "__main__":
     log.info("Starting OpenClaw Ollama Bot...")
+    # uvloop is a faster drop-in event loop; it doesn't support Windows, so
+    # fall back to the default loop when it isn't installed.
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        log.info("Using uvloop event loop")
+    except ImportError:
+        pass
     client.run(DISCORD_TOKEN)
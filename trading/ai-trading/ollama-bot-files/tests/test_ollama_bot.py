@@ -0,0 +1,236 @@
+"""
+Tests for the Ollama bot's VPS plumbing: SSE event stream parsing, the
+404 → polling fallback, the pending-event sweep and call_vps_api retries.
+
+Run from ollama-bot-files/: python -m unittest discover tests
+Uses a local aiohttp server in place of the VPS dashboard API.
+"""
+
+import asyncio
+import importlib.util
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+BOT_DIR = Path(__file__).resolve().parent.parent
+
+
+def load_bot():
+    """Import ollama-bot.py against a throwaway config."""
+    tmp = tempfile.mkdtemp(prefix="ollama-bot-test-")
+    config = {
+        "vps_api_url": "http://127.0.0.1:1",
+        "vps_api_key": "test-key",
+        "discord_bot_token": "unused",
+        "ollama_cache_dir": os.path.join(tmp, "cache"),
+    }
+    config_path = os.path.join(tmp, "config.json")
+    with open(config_path, "w") as f:
+        json.dump(config, f)
+    os.environ["OLLAMA_BOT_CONFIG"] = config_path
+    spec = importlib.util.spec_from_file_location("ollama_bot", BOT_DIR / "ollama-bot.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+bot = load_bot()
+
+
+class VpsStubTestCase(unittest.IsolatedAsyncioTestCase):
+    """Points the bot at a local aiohttp app built from self.routes()."""
+
+    def routes(self):
+        return []
+
+    async def asyncSetUp(self):
+        app = web.Application()
+        app.add_routes(self.routes())
+        self.server = TestServer(app)
+        await self.server.start_server()
+        url_patch = mock.patch.object(bot, "VPS_API_URL", str(self.server.make_url("")).rstrip("/"))
+        url_patch.start()
+        self.addCleanup(url_patch.stop)
+        bot._vps_backoff_until = 0.0
+
+    async def asyncTearDown(self):
+        await bot.close_http_session()
+        await self.server.close()
+
+
+async def drain(queue, count, timeout=2):
+    return [await asyncio.wait_for(queue.get(), timeout) for _ in range(count)]
+
+
+async def cancel(task):
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+
+class EventStreamTests(VpsStubTestCase):
+    def routes(self):
+        return [web.get("/api/events/stream", self.stream)]
+
+    async def stream(self, request):
+        self.api_key = request.headers.get("x-api-key")
+        resp = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await resp.prepare(request)
+        await resp.write(
+            b": ping\n\n"
+            b'id: 1\ndata: {"id": 1, "event_type": "BUY", "metadata": "{\\"price\\": 1.5}"}\n\n'
+            b"data: not json\n\n"
+            b"data: [1, 2]\n\n"
+            b'data: {"event_type": "SELL"}\n\n'
+            b'id: 2\ndata: {"id": 2, "event_type": "SELL", "metadata": {"pnl": 3}}\n\n'
+        )
+        await asyncio.sleep(5)
+        return resp
+
+    async def test_queues_valid_events_and_skips_malformed(self):
+        queue = asyncio.Queue()
+        task = asyncio.create_task(bot._consume_stream(queue, []))
+        try:
+            events = await drain(queue, 2)
+        finally:
+            await cancel(task)
+
+        self.assertEqual([e["id"] for e in events], [1, 2])
+        self.assertEqual(events[0]["metadata"], {"price": 1.5})
+        self.assertEqual(events[1]["metadata"], {"pnl": 3})
+        self.assertTrue(queue.empty())
+        self.assertEqual(self.api_key, "test-key")
+
+
+class StreamFallbackTests(VpsStubTestCase):
+    def routes(self):
+        return [web.get("/api/events/stream", self.not_found)]
+
+    async def not_found(self, request):
+        return web.Response(status=404)
+
+    async def test_404_cancels_helpers_and_polls(self):
+        polled = asyncio.Event()
+
+        async def fake_poll():
+            polled.set()
+
+        helper = asyncio.create_task(asyncio.sleep(60))
+        with mock.patch.object(bot, "poll_events", fake_poll):
+            await asyncio.wait_for(bot._consume_stream(asyncio.Queue(), [helper]), 2)
+
+        self.assertTrue(polled.is_set())
+        await asyncio.gather(helper, return_exceptions=True)
+        self.assertTrue(helper.cancelled())
+
+
+class SweepTests(VpsStubTestCase):
+    def routes(self):
+        return [web.post("/api/dashboard", self.dashboard)]
+
+    async def dashboard(self, request):
+        body = await request.json()
+        self.assertEqual(body["action"], "get_events")
+        return web.json_response({"data": [
+            {"id": 7, "event_type": "DCA", "metadata": '{"price": 2}'},
+            {"id": 8, "event_type": "BUY", "metadata": None},
+        ]})
+
+    async def test_sweep_requeues_pending_events(self):
+        queue = asyncio.Queue()
+        with mock.patch.object(bot, "STREAM_SWEEP_INTERVAL", 0):
+            task = asyncio.create_task(bot.sweep_events(queue))
+            try:
+                events = await drain(queue, 2)
+            finally:
+                await cancel(task)
+
+        self.assertEqual([e["id"] for e in events], [7, 8])
+        self.assertEqual(events[0]["metadata"], {"price": 2})
+
+
+class CallVpsApiRetryTests(VpsStubTestCase):
+    def routes(self):
+        self.attempts = 0
+        self.responses = []
+        return [web.post("/api/dashboard", self.dashboard)]
+
+    async def dashboard(self, request):
+        self.attempts += 1
+        status, headers = self.responses[min(self.attempts, len(self.responses)) - 1]
+        if status == 200:
+            return web.json_response({"data": [{"id": 1, "metadata": '{"price": 1}'}]})
+        return web.Response(status=status, headers=headers, text="nope")
+
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        backoff_patch = mock.patch.object(bot, "API_BACKOFF_BASE", 0)
+        backoff_patch.start()
+        self.addCleanup(backoff_patch.stop)
+
+    async def test_server_error_retried_until_exhausted(self):
+        self.responses = [(500, {})]
+        self.assertIsNone(await bot.call_vps_api("get_events"))
+        self.assertEqual(self.attempts, bot.API_MAX_RETRIES + 1)
+        self.assertEqual(bot.vps_backoff_remaining(), 0)
+
+    async def test_client_error_not_retried(self):
+        self.responses = [(400, {})]
+        self.assertIsNone(await bot.call_vps_api("get_events"))
+        self.assertEqual(self.attempts, 1)
+
+    async def test_transient_error_then_success(self):
+        self.responses = [(503, {}), (200, {})]
+        result = await bot.call_vps_api("get_events")
+        self.assertEqual(self.attempts, 2)
+        self.assertEqual(result["data"][0]["metadata"], {"price": 1})
+
+    async def test_interactive_429_gives_up_and_sets_backoff(self):
+        self.responses = [(429, {"Retry-After": "3"})]
+        self.assertIsNone(await bot.call_vps_api("get_events", interactive=True))
+        self.assertEqual(self.attempts, 1)
+        self.assertAlmostEqual(bot.vps_backoff_remaining(), 3, delta=0.5)
+
+    async def test_non_finite_retry_after_ignored(self):
+        self.responses = [(429, {"Retry-After": "inf"}), (200, {})]
+        self.assertIsNotNone(await bot.call_vps_api("get_events", interactive=True))
+        self.assertEqual(self.attempts, 2)
+
+
+class PostEventsDedupeTests(unittest.IsolatedAsyncioTestCase):
+    async def test_skips_posted_and_duplicate_ids_but_still_marks_them(self):
+        sent = []
+        marked = []
+
+        class Channel:
+            async def send(self, content=None, **kwargs):
+                sent.append(content)
+
+        async def fake_api(action, extra_data=None, interactive=False):
+            marked.extend(extra_data["eventIds"])
+            return {"success": True}
+
+        bot._posted_ids.clear()
+        bot._remember_posted(1)
+        events = [
+            {"id": 1, "event_type": "ENGINE_STOP", "metadata": {"cycle_count": 1}},
+            {"id": 2, "event_type": "ENGINE_STOP", "metadata": {"cycle_count": 2}},
+            {"id": 2, "event_type": "ENGINE_STOP", "metadata": {"cycle_count": 2}},
+        ]
+        with mock.patch.object(bot, "report_channel", Channel()), \
+                mock.patch.object(bot, "call_vps_api", fake_api), \
+                mock.patch.object(bot, "format_event_with_ollama",
+                                  mock.AsyncMock(side_effect=bot.format_event_fallback)):
+            await bot.post_events(events)
+
+        self.assertEqual(len(sent), 1)
+        self.assertEqual(sorted(marked), [1, 2])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,9 +5,9 @@ import express from 'express';
 import { exec } from 'child_process';
 import { promisify } from 'util';
 import { readFileSync, writeFileSync } from 'fs';
-import { query } from '../db/connection.js';
+import { query, getClient } from '../db/connection.js';
 import { getOpenPositions, getClosedPositions, getPortfolioSummary, closePosition, getPositionBySymbol } from '../lib/position-manager.js';
-import { getPendingEvents, markEventsPosted, getEventStats, queueEvent } from '../lib/events.js';
+import { getPendingEvents, getPendingEventsAfter, getEventById, markEventsPosted, getEventStats, queueEvent } from '../lib/events.js';
 import { getCurrentPrice, placeOrder } from '../lib/binance.js';
 import { getNewsContext } from '../lib/brave-search.js';
 import { anthropic, SONNET_MODEL, HAIKU_MODEL, extractJSON } from '../lib/claude.js';
@@ -147,6 +147,79 @@ app.post('/api/dashboard', authenticate, async (req, res) => {
   }
 });
 
+// ── Event stream (SSE) ──────────────────────────────────────
+// Pushes trade events to the Discord bot as they are queued, so it doesn't
+// have to poll get_events. The engine runs in a separate process; new events
+// reach us via Postgres NOTIFY from queueEvent().
+
+const streamClients = new Set();
+const STREAM_HEARTBEAT_MS = 25_000;
+const STREAM_REPLAY_PAGE = 100;
+const LISTENER_RETRY_MS = 5_000;
+let eventListener = null;
+
+function writeStreamEvent(res, event) {
+  res.write(`id: ${event.id}\ndata: ${JSON.stringify(event)}\n\n`);
+}
+
+async function startEventListener() {
+  try {
+    eventListener = await getClient();
+    eventListener.on('notification', async (msg) => {
+      if (streamClients.size === 0) return;
+      try {
+        const event = await getEventById(parseInt(msg.payload));
+        if (!event) return;
+        for (const res of streamClients) writeStreamEvent(res, event);
+      } catch (err) {
+        logger.error(`[API] Stream push failed for event #${msg.payload}: ${err.message}`);
+      }
+    });
+    eventListener.on('error', (err) => {
+      logger.error(`[API] Event listener error: ${err.message}`);
+      eventListener.release(err);
+      eventListener = null;
+      setTimeout(startEventListener, LISTENER_RETRY_MS);
+    });
+    await eventListener.query('LISTEN trade_events');
+    logger.info('[API] Listening for trade_events notifications');
+  } catch (err) {
+    logger.error(`[API] Event listener failed to start: ${err.message}`);
+    if (eventListener) {
+      eventListener.release(err);
+      eventListener = null;
+    }
+    setTimeout(startEventListener, LISTENER_RETRY_MS);
+  }
+}
+
+app.get('/api/events/stream', authenticate, async (req, res) => {
+  res.writeHead(200, {
+    'Content-Type': 'text/event-stream',
+    'Cache-Control': 'no-cache',
+    'Connection': 'keep-alive',
+  });
+  streamClients.add(res);
+  const heartbeat = setInterval(() => res.write(': ping\n\n'), STREAM_HEARTBEAT_MS);
+  req.on('close', () => {
+    clearInterval(heartbeat);
+    streamClients.delete(res);
+  });
+
+  // Replay everything still pending so events queued while disconnected aren't lost
+  try {
+    let afterId = 0;
+    while (streamClients.has(res)) {
+      const page = await getPendingEventsAfter(afterId, STREAM_REPLAY_PAGE);
+      for (const event of page) writeStreamEvent(res, event);
+      if (page.length < STREAM_REPLAY_PAGE) break;
+      afterId = page[page.length - 1].id;
+    }
+  } catch (err) {
+    logger.error(`[API] Stream replay failed: ${err.message}`);
+  }
+});
+
 // ── Action router ───────────────────────────────────────────
 
 async function handleAction(action, params) {
@@ -183,6 +256,23 @@ async function handleAction(action, params) {
       return { data: enriched };
     }
 
+    case 'get_dashboard_context': {
+      // Everything the Discord bot needs to answer a question, in one round trip
+      const positionsLimit = params.positions_limit || 10;
+      const [portfolio, positions, decisions] = await Promise.all([
+        handleAction('get_portfolio_summary', {}),
+        handleAction('get_positions', {}),
+        handleAction('get_decisions', { limit: params.decisions_limit || 5 }),
+      ]);
+      return {
+        data: {
+          portfolio: portfolio.data,
+          positions: positions.data.slice(0, positionsLimit),
+          decisions: decisions.data,
+        },
+      };
+    }
+
     case 'get_closed_trades': {
       const limit = params.limit || 20;
       const data = await getClosedPositions(limit);
@@ -860,4 +950,5 @@ app.use((err, _req, res, _next) => {
 
 app.listen(PORT, HOST, () => {
   logger.info(`[API] Dashboard API running on ${HOST}:${PORT}`);
+  startEventListener();
 });
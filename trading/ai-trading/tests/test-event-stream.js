@@ -0,0 +1,163 @@
+import dotenv from 'dotenv';
+dotenv.config();
+
+import { query, endPool } from '../db/connection.js';
+import { queueEvent, getPendingEventsAfter } from '../lib/events.js';
+
+// Exercises the /api/events/stream push path against a running dashboard API:
+// replay paging on connect and NOTIFY delivery of newly queued events.
+// Stop the Discord bot first — it would post and mark the test events.
+
+const BASE_URL = `http://127.0.0.1:${process.env.DASHBOARD_API_PORT || 3000}`;
+const API_KEY = process.env.DASHBOARD_API_KEY;
+const TEST_EVENT_TYPE = 'TEST_STREAM';
+const BACKLOG_SIZE = 250; // > 2 × the server's replay page size (100)
+
+let passed = 0;
+let failed = 0;
+
+function assert(label, condition, detail = '') {
+  if (condition) {
+    console.log(`  PASS  ${label}`);
+    passed++;
+  } else {
+    console.log(`  FAIL  ${label}${detail ? ' — ' + detail : ''}`);
+    failed++;
+  }
+}
+
+/**
+ * Open the SSE stream and collect parsed events by ID. `waitFor(predicate)`
+ * resolves true once the predicate holds over the collected map, false on timeout.
+ */
+function openStream(apiKey = API_KEY) {
+  const controller = new AbortController();
+  const seen = new Map();
+  const waiters = [];
+  const ready = fetch(`${BASE_URL}/api/events/stream`, {
+    headers: { 'x-api-key': apiKey },
+    signal: controller.signal,
+  }).then(async (res) => {
+    if (res.status !== 200) return res;
+    (async () => {
+      const decoder = new TextDecoder();
+      let buffer = '';
+      try {
+        for await (const chunk of res.body) {
+          buffer += decoder.decode(chunk, { stream: true });
+          let sep;
+          while ((sep = buffer.indexOf('\n\n')) !== -1) {
+            const block = buffer.slice(0, sep);
+            buffer = buffer.slice(sep + 2);
+            const data = block.split('\n').find(l => l.startsWith('data: '));
+            if (!data) continue;
+            const event = JSON.parse(data.slice(6));
+            seen.set(event.id, event);
+            waiters.forEach(w => w());
+          }
+        }
+      } catch {
+        // aborted
+      }
+    })();
+    return res;
+  });
+
+  function waitFor(predicate, timeoutMs = 10_000) {
+    return new Promise((resolve) => {
+      const check = () => {
+        if (predicate(seen)) { clearTimeout(timer); resolve(true); }
+      };
+      const timer = setTimeout(() => resolve(false), timeoutMs);
+      waiters.push(check);
+      check();
+    });
+  }
+
+  return { ready, seen, waitFor, close: () => controller.abort() };
+}
+
+async function cleanup() {
+  await query('DELETE FROM trade_events WHERE event_type = $1', [TEST_EVENT_TYPE]);
+}
+
+// ─── Test suites ────────────────────────────────────────────
+
+async function testAuthReject() {
+  console.log('\n── Stream Auth ──');
+  const stream = openStream('wrong-key');
+  const res = await stream.ready;
+  assert('Bad API key returns 401', res.status === 401, `status ${res.status}`);
+  stream.close();
+}
+
+async function testReplayPaging(backlogIds) {
+  console.log('\n── Pending Event Paging ──');
+  const collected = [];
+  let afterId = 0;
+  for (;;) {
+    const page = await getPendingEventsAfter(afterId, 50);
+    collected.push(...page.filter(e => e.event_type === TEST_EVENT_TYPE).map(e => e.id));
+    if (page.length < 50) break;
+    afterId = page[page.length - 1].id;
+  }
+  assert('getPendingEventsAfter walks the full backlog',
+    backlogIds.every(id => collected.includes(id)), `${collected.length}/${backlogIds.length}`);
+  assert('Pages are in ID order with no duplicates',
+    collected.every((id, i) => i === 0 || id > collected[i - 1]));
+
+  console.log('\n── Stream Replay On Connect ──');
+  const stream = openStream();
+  const res = await stream.ready;
+  assert('Stream connects with 200', res.status === 200, `status ${res.status}`);
+  assert('Stream is text/event-stream', (res.headers.get('content-type') || '').startsWith('text/event-stream'));
+  const allReplayed = await stream.waitFor(seen => backlogIds.every(id => seen.has(id)));
+  const got = backlogIds.filter(id => stream.seen.has(id)).length;
+  assert(`Replay delivers all ${backlogIds.length} pending events (past the first page)`, allReplayed,
+    `${got}/${backlogIds.length}`);
+  return stream;
+}
+
+async function testNotifyDelivery(stream) {
+  console.log('\n── NOTIFY Delivery ──');
+  const id = await queueEvent(TEST_EVENT_TYPE, 'TESTUSDT', { note: 'live push' });
+  const delivered = await stream.waitFor(seen => seen.has(id), 5_000);
+  assert('Newly queued event is pushed to the open stream', delivered, `event #${id}`);
+  if (delivered) {
+    const event = stream.seen.get(id);
+    assert('Pushed event carries its metadata', event.metadata?.note === 'live push', JSON.stringify(event.metadata));
+  }
+}
+
+// ─── Runner ─────────────────────────────────────────────────
+
+async function run() {
+  console.log('=== OpenClaw Event Stream Test Suite ===');
+  console.log(`Target: ${BASE_URL}`);
+
+  let stream = null;
+  try {
+    await cleanup();
+    const backlogIds = [];
+    for (let i = 0; i < BACKLOG_SIZE; i++) {
+      backlogIds.push(await queueEvent(TEST_EVENT_TYPE, 'TESTUSDT', { seq: i }));
+    }
+
+    await testAuthReject();
+    stream = await testReplayPaging(backlogIds);
+    await testNotifyDelivery(stream);
+  } catch (err) {
+    console.error(`\nFATAL: ${err.message}`);
+    console.error(err.stack);
+    failed++;
+  } finally {
+    if (stream) stream.close();
+    await cleanup().catch(() => {});
+    await endPool();
+  }
+
+  console.log(`\n=== Results: ${passed} passed, ${failed} failed ===`);
+  process.exit(failed > 0 ? 1 : 0);
+}
+
+run();